@@ -1,13 +1,25 @@
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
+import select
+import signal
+import socket
 import sys
-from collections.abc import Sequence, Mapping
+import threading
+from collections.abc import Collection, Sequence, Mapping
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
-from time import sleep
-from typing import Final, Optional, cast, Any
+from hashlib import blake2b
+from time import monotonic, sleep
+from typing import Final, NamedTuple, Optional, Any
 
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+from urllib3.util import Retry
 
 from structures import *
 
@@ -26,9 +38,36 @@ CHECK_INTERVAL: Final[timedelta] = timedelta(minutes=3)
 # alternate value for CHECK_INTERVAL, used if the last check encountered any errors
 CHECK_INTERVAL_ERROR: Final[timedelta] = timedelta(minutes=1)
 
+# longest Retry-After waited for when retrying a request to Picarto or for the configuration
+# (the wait happens inside the request, where it can't be interrupted)
+REQUEST_MAX_RETRY_AFTER: Final[timedelta] = timedelta(seconds=30)
+
+# fraction of CHECK_INTERVAL added for each consecutive check that found no tracked creators online
+CHECK_INTERVAL_IDLE_BACKOFF: Final[float] = 0.5
+
+# maximum number of consecutive idle checks counted towards CHECK_INTERVAL_IDLE_BACKOFF
+CHECK_INTERVAL_IDLE_MAX_STEPS: Final[int] = 5
+
 # interval between each notification being set (per creator, per webhook URL)
 NOTIFY_INTERVAL: Final[timedelta] = timedelta(minutes=15)
 
+# maximum number of notifications being sent at the same time (per webhook)
+# (only a concurrency cap, Discord's rate limit of about 5 requests every 2 seconds per webhook
+# is still enforced by its 429 responses)
+NOTIFY_MAX_WORKERS: Final[int] = 5
+
+# longest Retry-After we wait for before sending a rate limited notification again
+NOTIFY_MAX_RETRY_AFTER: Final[timedelta] = timedelta(seconds=10)
+
+# maximum number of notifications being sent at the same time (across all webhook URLs)
+NOTIFY_MAX_IN_FLIGHT: Final[int] = 32
+
+# maximum number of notifications combined into a single message (Discord allows up to 10 embeds)
+NOTIFY_MAX_EMBEDS: Final[int] = 10
+
+# maximum length of a combined message's content (Discord rejects messages with more than 2000 characters)
+NOTIFY_MAX_CONTENT_LENGTH: Final[int] = 2000
+
 
 def _create_logger() -> logging.Logger:
     fmt = logging.Formatter('[{asctime}] [{levelname:8}] {message}',
@@ -43,23 +82,159 @@ def _create_logger() -> logging.Logger:
     h_file.setFormatter(fmt)
     h_file.setLevel(logging.DEBUG)
 
+    # writing to (and rotating) the log file happens on the listener's thread,
+    # so logging from the notify threads doesn't wait on disk I/O
+    q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    h_queue = logging.handlers.QueueHandler(q)
+    h_queue.setLevel(logging.DEBUG)
+
+    listener = logging.handlers.QueueListener(q, h_file, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
     _l = logging.getLogger('picartonotif')
     _l.setLevel(logging.DEBUG)
     _l.addHandler(h_err)
-    _l.addHandler(h_file)
+    _l.addHandler(h_queue)
     return _l
 
 
 logger: Final[logging.Logger] = _create_logger()
 
 
-def timestamp_url(url: str) -> str:
-    timestamp = datetime.now(timezone.utc).strftime('%Y%m%d%H%M')
+class _CappedRetry(Retry):
+    def get_retry_after(self, response: HTTPResponse) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, REQUEST_MAX_RETRY_AFTER.total_seconds())
+
+
+def _create_session() -> requests.Session:
+    # POST isn't in Retry's default allowed methods, so webhook posts are only retried
+    # if the connection couldn't be made, and a notification is never delivered twice
+    retry = _CappedRetry(total=3, backoff_factor=1.0,
+                         status_forcelist=[429, 500, 502, 503, 504],
+                         respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retry)
+
+    _s = requests.Session()
+    _s.mount('https://', adapter)
+    return _s
+
+
+# shared between all threads, so connections to Picarto and Discord are kept alive
+session: Final[requests.Session] = _create_session()
+
+
+def create_timestamp() -> str:
+    # created once per check and shared by every URL built during it
+    return datetime.now(timezone.utc).strftime('%Y%m%d%H%M')
+
+
+def timestamp_url(url: str, timestamp: str) -> str:
     return f'{url}?_t={timestamp}'
 
 
-# used for dict.get(key, default) calls to represent missing keys
-_MISSING_KEY: Final[object] = object()
+# sent with every notification, since the payload is encoded by orjson instead of requests
+_JSON_HEADERS: Final[Mapping[str, str]] = {'Content-Type': 'application/json'}
+
+# NOTIFY_INTERVAL in seconds, compared against time.monotonic() differences
+_NOTIFY_INTERVAL_S: Final[float] = NOTIFY_INTERVAL.total_seconds()
+
+# limits notifications in flight across all webhooks
+_notify_slots: Final[threading.BoundedSemaphore] = threading.BoundedSemaphore(NOTIFY_MAX_IN_FLIGHT)
+
+
+def post_notification(url: str, payload: Mapping[str, Any]) -> requests.Response:
+    data = orjson.dumps(payload)
+    with _notify_slots:
+        response = session.post(url, data=data, headers=_JSON_HEADERS, timeout=10)
+
+    if response.status_code == 429:
+        # rate limited requests aren't processed, so sending it again can't post it twice
+        try:
+            retry_after = float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return response
+
+        if retry_after <= NOTIFY_MAX_RETRY_AFTER.total_seconds():
+            # don't hold on to a slot while waiting
+            sleep(retry_after)
+            with _notify_slots:
+                response = session.post(url, data=data, headers=_JSON_HEADERS, timeout=10)
+
+    return response
+
+
+def create_allowed_mentions_dict(everyone: bool, roles: Collection[str],
+                                 users: Collection[str]) -> dict[str, Any]:
+    result: dict[str, Any] = {}
+    parse: list[str] = []
+
+    if everyone:
+        parse.append('everyone')
+
+    if len(roles) > 100:
+        # 'roles' array has a maximum length of 100 items
+        # past that, we must allow all role mentions
+        parse.append('roles')
+    elif len(roles) > 0:
+        result['roles'] = list(roles)
+
+    if len(users) > 100:
+        # 'users' array has a maximum length of 100 items
+        # past that, we must allow all user mentions
+        parse.append('users')
+    elif len(users) > 0:
+        result['users'] = list(users)
+
+    result['parse'] = parse
+    return result
+
+
+def create_embed_dict(name: str, profile_url: str, data: Mapping[str, Any],
+                      timestamp: str) -> Mapping[str, Any]:
+    image_url: Optional[str] = None
+    thumbnails = data.get('thumbnails')
+    if isinstance(thumbnails, dict) \
+            and 'web' in thumbnails:
+        image_url = thumbnails['web']
+
+    embed: dict[str, Any] = {
+        'title': data.get('title', '(unnamed stream)'),
+        'description': f"Join {data.get('viewers', 0)} other viewers in **{name}**'s stream!",
+        'url': profile_url,
+        'color': 0x4C90F3,
+    }
+
+    if 'avatar' in data:
+        embed['thumbnail'] = {'url': timestamp_url(data['avatar'], timestamp)}
+
+    if image_url is not None:
+        embed['image'] = {'url': timestamp_url(image_url, timestamp)}
+
+    footer_parts: list[str] = []
+
+    if data.get('adult', False):
+        footer_parts.append('Mature Content (NSFW)')
+
+    if data.get('gaming', False):
+        footer_parts.append('Gaming')
+
+    if 'category' in data:
+        footer_parts.append(data['category'])
+
+    if len(footer_parts) > 0:
+        embed['footer'] = {'text': ' | '.join(footer_parts)}
+
+    return embed
+
+
+# accepted spellings of DiscordEveryonePing and DiscordHerePing
+_EVERYONE_PINGS: Final[frozenset[str]] = frozenset(('@everyone', 'everyone'))
+_HERE_PINGS: Final[frozenset[str]] = frozenset(('@here', 'here'))
+_MASS_PINGS: Final[frozenset[str]] = _EVERYONE_PINGS | _HERE_PINGS
 
 
 def validate_creator_config(name: str, config: PicartoCreatorConfig,
@@ -67,45 +242,46 @@ def validate_creator_config(name: str, config: PicartoCreatorConfig,
     logger.info('%sValidating configuration for creator "%s":', indent, name)
     success: bool = True
 
-    pings = config.get('pings', _MISSING_KEY)
-    if pings == _MISSING_KEY:
+    try:
+        pings = config['pings']
+    except KeyError:
         logger.error("%sMissing required key 'pings'", indent)
         success = False
-    elif not isinstance(pings, Sequence):
-        logger.error("%sKey 'pings' has invalid value (expected 'Sequence', got '%s')",
-                     indent, repr(pings))
-        success = False
+    except TypeError:
+        logger.error("%sInvalid configuration (expected 'Mapping', got '%r')", indent, config)
+        return False
     else:
-        p_indent = indent + '  '
-        logger.info("%sValidating pings:", p_indent)
-
-        for ping in pings:
-            if isinstance(ping, dict):
-                flake = ping.get('role', _MISSING_KEY)
-                if flake != _MISSING_KEY:
-                    if not isinstance(flake, str):
-                        logger.error("%sRole ping has invalid snowflake value "
-                                     "(expected 'istrnt', got '%s')", p_indent, repr(flake))
-                        success = False
-                    continue
+        if type(pings) is not list and not isinstance(pings, Sequence):
+            logger.error("%sKey 'pings' has invalid value (expected 'Sequence', got '%r')",
+                         indent, pings)
+            success = False
+        else:
+            p_indent = indent + '  '
+            logger.info("%sValidating pings:", p_indent)
+
+            for ping in pings:
+                if isinstance(ping, dict):
+                    if 'role' in ping:
+                        if not isinstance(ping['role'], str):
+                            logger.error("%sRole ping has invalid snowflake value "
+                                         "(expected 'str', got '%r')", p_indent, ping['role'])
+                            success = False
+                        continue
 
-                flake = ping.get('user', _MISSING_KEY)
-                if flake != _MISSING_KEY:
-                    if not not isinstance(flake, str):
-                        logger.error("%sUser ping has invalid snowflake value "
-                                     "(expected 'istrnt', got '%s')", p_indent, repr(flake))
-                        success = False
-                    continue
+                    if 'user' in ping:
+                        if not isinstance(ping['user'], str):
+                            logger.error("%sUser ping has invalid snowflake value "
+                                         "(expected 'str', got '%r')", p_indent, ping['user'])
+                            success = False
+                        continue
 
-            elif isinstance(ping, str):
-                if ping == '@everyone' or ping == 'everyone':
-                    continue
-                elif ping == '@here' or ping == 'here':
-                    continue
+                elif isinstance(ping, str):
+                    if ping in _MASS_PINGS:
+                        continue
 
-            logger.warning("%sUnrecognized ping '%s', will be ignored",
-                           p_indent, repr(ping))
-            # not a failure!
+                logger.warning("%sUnrecognized ping '%r', will be ignored",
+                               p_indent, ping)
+                # not a failure!
 
     return success
 
@@ -115,28 +291,35 @@ def validate_webhook_config(name: str, config: DiscordWebhookConfig,
     logger.info('%sValidating configuration for webhook "%s":', indent, name)
     success: bool = True
 
-    url = config.get('url', _MISSING_KEY)
-    if url == _MISSING_KEY:
+    try:
+        url = config['url']
+    except KeyError:
         logger.error("%sMissing required key 'url'", indent)
         success = False
-    elif not isinstance(url, str):
-        logger.error("%sKey 'url' has invalid value (expected 'str', got '%s')",
-                     indent, repr(url))
-        success = False
-    
-    creators = config.get('creators', _MISSING_KEY)
-    if creators == _MISSING_KEY:
+    except TypeError:
+        logger.error("%sInvalid configuration (expected 'Mapping', got '%r')", indent, config)
+        return False
+    else:
+        if not isinstance(url, str):
+            logger.error("%sKey 'url' has invalid value (expected 'str', got '%r')",
+                         indent, url)
+            success = False
+
+    try:
+        creators = config['creators']
+    except KeyError:
         logger.error("%sMissing required key 'creators'", indent)
         success = False
-    elif not isinstance(creators, Mapping):
-        logger.error("%sKey 'creators' has invalid value (expected 'Mapping', got '%s')",
-                     indent, repr(creators))
-        success = False
     else:
-        c_indent = indent + '  '
-        for c_name, c_config in creators.items():
-            if not validate_creator_config(c_name, c_config, indent=c_indent):
-                success = False
+        if type(creators) is not dict and not isinstance(creators, Mapping):
+            logger.error("%sKey 'creators' has invalid value (expected 'Mapping', got '%r')",
+                         indent, creators)
+            success = False
+        else:
+            c_indent = indent + '  '
+            for c_name, c_config in creators.items():
+                if not validate_creator_config(c_name, c_config, indent=c_indent):
+                    success = False
 
     return success
 
@@ -146,42 +329,84 @@ def validate_config(config: NotifierConfig,
     logger.info('%sValidating configuration:', indent)
     success: bool = True
 
-    user_agent = config.get('user_agent', _MISSING_KEY)
-    if user_agent == _MISSING_KEY:
+    try:
+        user_agent = config['user_agent']
+    except KeyError:
         logger.error("%sMissing required key 'user_agent'", indent)
         success = False
-    elif not isinstance(user_agent, str):
-        logger.error("%sKey 'user_agent' has invalid value (expected 'str', got '%s')",
-                     indent, repr(user_agent))
-        success = False
+    except TypeError:
+        logger.error("%sInvalid configuration (expected 'Mapping', got '%r')", indent, config)
+        return False
+    else:
+        if not isinstance(user_agent, str):
+            logger.error("%sKey 'user_agent' has invalid value (expected 'str', got '%r')",
+                         indent, user_agent)
+            success = False
 
-    email = config.get('email', _MISSING_KEY)
-    if email == _MISSING_KEY:
+    try:
+        email = config['email']
+    except KeyError:
         logger.error("%sMissing required key 'email'", indent)
         success = False
-    elif not isinstance(email, str):
-        logger.error("%sKey 'email' has invalid value (expected 'str', got '%s')",
-                     indent, repr(email))
-        success = False
+    else:
+        if not isinstance(email, str):
+            logger.error("%sKey 'email' has invalid value (expected 'str', got '%r')",
+                         indent, email)
+            success = False
 
-    webhooks = config.get('webhooks', _MISSING_KEY)
-    if webhooks == _MISSING_KEY:
+    try:
+        webhooks = config['webhooks']
+    except KeyError:
         logger.error("%sMissing required key 'webhooks'", indent)
         success = False
-    elif not isinstance(webhooks, Mapping):
-        logger.error("%sKey 'webhooks' has invalid value (expected 'Mapping', got '%s')",
-                     indent, repr(webhooks))
-        success = False
     else:
-        w_indent = indent + '  '
-        for w_name, w_config in webhooks.items():
-            if not validate_webhook_config(w_name, w_config, indent=w_indent):
-                success = False
+        if type(webhooks) is not dict and not isinstance(webhooks, Mapping):
+            logger.error("%sKey 'webhooks' has invalid value (expected 'Mapping', got '%r')",
+                         indent, webhooks)
+            success = False
+        else:
+            w_indent = indent + '  '
+            for w_name, w_config in webhooks.items():
+                if not validate_webhook_config(w_name, w_config, indent=w_indent):
+                    success = False
+
+    return success
+
+
+def validate_online_response(response: Sequence[Any]) -> bool:
+    success: bool = True
+
+    for i, data in enumerate(response):
+        try:
+            creator_name = data['name']
+        except KeyError:
+            logger.error("Unexpected API response (Mapping at index %s missing key 'name')",
+                         i)
+            success = False
+            continue
+        except TypeError:
+            logger.error("Unexpected API response (expected 'Mapping' at [%s], got '%r')",
+                         i, data)
+            success = False
+            continue
+
+        if not isinstance(creator_name, str):
+            logger.error("Unexpected API response (expected 'str' at [%s].name, got '%r')",
+                         i, creator_name)
+            success = False
 
     return success
 
 
+# returned instead of a response body if it didn't change since it was last fetched
+_NOT_MODIFIED: Final[object] = object()
+
+
 class PicartoCreator:
+    __slots__ = ('__name', '__actual_name',
+                 'ping_everyone', 'ping_here', 'ping_roles', 'ping_users',
+                 '_config', '_content_prefix', '_allowed_mentions', '_message_content', '_profile_url')
+
     __name: str                   # as defined by configuration
     __actual_name: Optional[str]  # as defined by Picarto
     ping_everyone: bool
@@ -189,6 +414,16 @@ class PicartoCreator:
     ping_roles: set[str]
     ping_users: set[str]
 
+    # last applied configuration, updating to an equal one is skipped
+    _config: Optional[PicartoCreatorConfig]
+    # derived from pings, rebuilt on every config update
+    _content_prefix: str
+    _allowed_mentions: dict[str, Any]
+    # built on first use, cleared whenever the name or pings change
+    _message_content: Optional[str]
+    # built on first use, cleared whenever the name changes
+    _profile_url: Optional[str]
+
     def __init__(self, name: str, config: PicartoCreatorConfig,
                  *, indent: str = ''):
         self.__name = name
@@ -197,6 +432,11 @@ class PicartoCreator:
         self.ping_here = False
         self.ping_roles = set()
         self.ping_users = set()
+        self._config = None
+        self._content_prefix = ''
+        self._allowed_mentions = {}
+        self._message_content = None
+        self._profile_url = None
         self.update_config(name, config, indent=indent)
 
     @property
@@ -208,26 +448,35 @@ class PicartoCreator:
         if name.casefold() != self.__name.casefold():
             self.__name = name
             self.__actual_name = None
+            self._message_content = None
+            self._profile_url = None
 
     def update_config(self, name: str, config: PicartoCreatorConfig,
                       *, indent: str = ''):
         self.name = name
 
+        if config == self._config:
+            logger.debug('%sPings unchanged', indent)
+            return
+        self._config = config
+
         self.ping_everyone = False
         self.ping_here = False
         self.ping_roles.clear()
         self.ping_users.clear()
 
         for ping in config['pings']:
-            if isinstance(ping, dict):
-                if 'role' in ping:
-                    self.ping_roles.add(cast(DiscordRolePing, ping)['role'])
-                elif 'user' in ping:
-                    self.ping_users.add(cast(DiscordUserPing, ping)['user'])
-            elif isinstance(ping, str):
-                if ping == '@everyone' or ping == 'everyone':
+            # configuration is decoded from JSON, so exact type checks are enough here
+            ping_type = type(ping)
+            if ping_type is dict:
+                if (role := ping.get('role')) is not None:
+                    self.ping_roles.add(role)
+                elif (user := ping.get('user')) is not None:
+                    self.ping_users.add(user)
+            elif ping_type is str:
+                if ping in _EVERYONE_PINGS:
                     self.ping_everyone = True
-                elif ping == '@here' or ping == 'here':
+                elif ping in _HERE_PINGS:
                     self.ping_here = True
 
         ping_list: list[str] = []
@@ -240,18 +489,30 @@ class PicartoCreator:
 
         logger.debug('%sNow pings: %s', indent, ', '.join(ping_list))
 
-    def create_webhook_post_json(self, data: Mapping[str, Any]) -> Mapping[str, Any]:
-        if 'name' in data:
-            # update proper casing of name from Picarto
-            self.__actual_name = data['name']
+        self._content_prefix = self._create_content_prefix()
+        self._allowed_mentions = self._create_allowed_mentions_dict()
+        self._message_content = None
 
-        return {
-            'content': self._create_message_content(),
-            'embeds': [self._create_embed_dict(data)],
-            'allowed_mentions': self._create_allowed_mentions_dict(),
-        }
+    @property
+    def allowed_mentions(self) -> Mapping[str, Any]:
+        return self._allowed_mentions
+
+    def create_message_content(self) -> str:
+        if self._message_content is None:
+            self._message_content = f"{self._content_prefix} **{self.name}** is now live!"
+        return self._message_content
+
+    def has_same_pings(self, other: 'PicartoCreator') -> bool:
+        return self.ping_everyone == other.ping_everyone and self.ping_here == other.ping_here \
+            and self.ping_roles == other.ping_roles and self.ping_users == other.ping_users
+
+    @property
+    def profile_url(self) -> str:
+        if self._profile_url is None:
+            self._profile_url = f'https://picarto.tv/{self.name}'
+        return self._profile_url
 
-    def _create_message_content(self) -> str:
+    def _create_content_prefix(self) -> str:
         pings: list[str] = []
 
         if self.ping_everyone:
@@ -262,78 +523,44 @@ class PicartoCreator:
 
         pings.extend([f'<@&{flake}>' for flake in self.ping_roles])
         pings.extend([f'<@{flake}>' for flake in self.ping_users])
-        return f"{' '.join(pings)} **{self.name}** is now live!"
+        return ' '.join(pings)
 
     def _create_allowed_mentions_dict(self) -> dict[str, Any]:
-        result: dict[str, Any] = {}
-        parse: list[str] = []
-
-        if self.ping_everyone or self.ping_here:
-            parse.append('everyone')
-
-        if len(self.ping_roles) > 100:
-            # 'roles' array has a maximum length of 100 items
-            # past that, we must allow all role mentions
-            parse.append('roles')
-        elif len(self.ping_roles) > 0:
-            result['roles'] = [flake for flake in self.ping_roles]
-
-        if len(self.ping_users) > 100:
-            # 'users' array has a maximum length of 100 items
-            # past that, we must allow all user mentions
-            parse.append('user')
-        elif len(self.ping_users) > 0:
-            result['users'] = [flake for flake in self.ping_users]
-
-        result['parse'] = parse
-        return result
-
-    def _create_embed_dict(self, data: Mapping[str, Any]) -> Mapping[str, Any]:
-        image_url: Optional[str] = None
-        thumbnails = data.get('thumbnails')
-        if isinstance(thumbnails, dict) \
-                and 'web' in thumbnails:
-            image_url = thumbnails['web']
-
-        embed: dict[str, Any] = {
-            'title': data.get('title', '(unnamed stream)'),
-            'description': f"Join {data.get('viewers', 0)} other viewers in **{self.name}**'s stream!",
-            'url': f'https://picarto.tv/{self.name}',
-            'color': 0x4C90F3,
-        }
-
-        if 'avatar' in data:
-            embed['thumbnail'] = {'url': timestamp_url(data['avatar'])}
-
-        if image_url is not None:
-            embed['image'] = {'url': timestamp_url(image_url)}
-
-        footer_parts: list[str] = []
-
-        if data.get('adult', False):
-            footer_parts.append('Mature Content (NSFW)')
-
-        if data.get('gaming', False):
-            footer_parts.append('Gaming')
+        return create_allowed_mentions_dict(self.ping_everyone or self.ping_here,
+                                            self.ping_roles, self.ping_users)
 
-        if 'category' in data:
-            footer_parts.append(data['category'])
+    def update_actual_name(self, data: Mapping[str, Any]):
+        if 'name' in data and data['name'] != self.__actual_name:
+            # update proper casing of name from Picarto
+            self.__actual_name = data['name']
+            self._message_content = None
+            self._profile_url = None
 
-        if len(footer_parts) > 0:
-            embed['footer'] = {'text': ' | '.join(footer_parts)}
 
-        return embed
+class PendingNotification(NamedTuple):
+    key: str
+    creator: PicartoCreator
+    content: str
+    embed: Mapping[str, Any]
 
 
 class DiscordWebhook:
+    __slots__ = ('name', 'url', 'creators', 'online_creators', 'last_notified', '_config', '_executor')
+
     name: str
     url: str
     creators: dict[str, PicartoCreator]
 
     # keys of creators that we know are online
     online_creators: set[str]
-    # last time we pushed a notification for a creator to the webhook
-    last_notified: dict[str, datetime]
+    # last time (time.monotonic()) we pushed a notification for a creator to the webhook
+    last_notified: dict[str, float]
+
+    # last applied configuration, updating to an equal one is skipped
+    _config: Optional[DiscordWebhookConfig]
+
+    # sends notifications concurrently
+    _executor: ThreadPoolExecutor
 
     def __init__(self, name: str, config: DiscordWebhookConfig,
                  *, indent: str = ''):
@@ -342,16 +569,27 @@ class DiscordWebhook:
         self.creators = {}
         self.online_creators = set()
         self.last_notified = {}
+        self._config = None
+        self._executor = ThreadPoolExecutor(max_workers=NOTIFY_MAX_WORKERS,
+                                            thread_name_prefix='webhook')
         self.update_config(name, config, indent=indent)
 
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
     def update_config(self, name: str, config: DiscordWebhookConfig,
                       *, indent: str = ''):
         self.name = name
+
+        if config == self._config:
+            logger.debug('%sNo changes', indent)
+            return
+        self._config = config
+
         self.url = config['url']
 
-        removed_creators: set[str] = set(self.creators.keys())
-        removed_creators.update(self.online_creators)
-        removed_creators.update(self.last_notified.keys())
+        # online_creators and last_notified only ever hold keys of creators we have
+        removed_creators = self.creators.keys() - {c_name.casefold() for c_name in config['creators']}
 
         c_indent = indent + '  '
         for c_name, c_config in config['creators'].items():
@@ -364,30 +602,35 @@ class DiscordWebhook:
                 logger.debug('%sNew creator "%s" added:', indent, c_name)
                 self.creators[key] = PicartoCreator(c_name, c_config, indent=c_indent)
 
-            removed_creators.discard(key)
-
         for key in removed_creators:
-            creator = self.creators.pop(key, None)
-            if creator is not None:
-                logger.debug('%sCreator "%s" removed', indent, creator.name)
-                pass
-
+            creator = self.creators.pop(key)
+            logger.debug('%sCreator "%s" removed', indent, creator.name)
             self.last_notified.pop(key, None)
 
         self.online_creators.difference_update(removed_creators)
 
-    def notify(self, online_creators: Mapping[str, Mapping[str, Any]]) -> bool:
+    # 'sent' maps keys of creators that other webhooks with the same URL already posted during this check
+    # to the creator (and its pings) they were posted with, and gets updated with the creators this webhook posts
+    def notify(self, online_creators: Mapping[str, Mapping[str, Any]], timestamp: str,
+               embeds: dict[str, Mapping[str, Any]], sent: dict[str, 'PicartoCreator']) -> bool:
         success: bool = True
 
-        now = datetime.now(timezone.utc)
+        now = monotonic()
+
+        # forget notifications that are too old to hold back new ones,
+        # everything left in last_notified is recent enough to throttle its creator
+        if any(now - when >= _NOTIFY_INTERVAL_S for when in self.last_notified.values()):
+            self.last_notified = {c_key: when for c_key, when in self.last_notified.items()
+                                  if now - when < _NOTIFY_INTERVAL_S}
 
         # mark every known online creator as offline
         offline_creators: set[str] = set(self.online_creators)
 
-        for c_key, c_data in online_creators.items():
-            if c_key not in self.creators:
-                continue
+        # creators that need to be notified about
+        pending: list[PendingNotification] = []
 
+        # only look at online creators this webhook actually tracks
+        for c_key in online_creators.keys() & self.creators.keys():
             # remove "creator is now offline" mark
             offline_creators.discard(c_key)
 
@@ -395,48 +638,192 @@ class DiscordWebhook:
             if c_key in self.online_creators:
                 continue
 
-            if c_key in self.last_notified \
-                    and now - self.last_notified[c_key] < NOTIFY_INTERVAL:
+            if c_key in self.last_notified:
                 continue
 
             creator = self.creators[c_key]
-            try:
-                requests.post(self.url,
-                              json=creator.create_webhook_post_json(c_data),
-                              timeout=10).raise_for_status()
-                # mark creator as online
+
+            sent_creator = sent.get(c_key)
+            if sent_creator is not None and sent_creator.has_same_pings(creator):
+                # another webhook with the same URL just posted this creator with the same mentions,
+                # treat it as our own
                 self.online_creators.add(c_key)
                 self.last_notified[c_key] = now
-                logger.debug('Webhook "%s" sent notification for creator "%s"',
-                             self.name, creator.name)
-            except requests.exceptions.RequestException as exc:
-                logger.error('Webhook "%s" failed to send notification for creator "%s"',
-                             self.name, creator.name,
-                             exc_info=exc)
-                success = False
+                continue
+
+            c_data = online_creators[c_key]
+            creator.update_actual_name(c_data)
+
+            # embeds don't depend on the webhook, build each one once and share it
+            embed = embeds.get(c_key)
+            if embed is None:
+                embed = create_embed_dict(creator.name, creator.profile_url, c_data, timestamp)
+                embed = embeds.setdefault(c_key, embed)
+            pending.append(PendingNotification(c_key, creator, creator.create_message_content(), embed))
+
+        # send all batches at once, results are handled on this thread
+        futures = [self._executor.submit(self._send, batch) for batch in self._create_batches(pending)]
+
+        for future in as_completed(futures):
+            for notification, exc in future.result():
+                if exc is None:
+                    # mark creator as online
+                    self.online_creators.add(notification.key)
+                    self.last_notified[notification.key] = now
+                    sent[notification.key] = notification.creator
+                    logger.debug('Webhook "%s" sent notification for creator "%s"',
+                                 self.name, notification.creator.name)
+                else:
+                    logger.error('Webhook "%s" failed to send notification for creator "%s"',
+                                 self.name, notification.creator.name,
+                                 exc_info=exc)
+                    success = False
 
         # remove creators we marked as offline from the online creators set
         self.online_creators.difference_update(offline_creators)
 
         return success
 
+    def _send(self, batch: Sequence[PendingNotification]) \
+            -> list[tuple[PendingNotification, Optional[requests.exceptions.RequestException]]]:
+        if len(batch) > 1:
+            try:
+                post_notification(self.url, self._create_post_json(batch)).raise_for_status()
+                return [(notification, None) for notification in batch]
+            except requests.exceptions.RequestException as exc:
+                # only a rejected payload is worth sending again in parts. after a timeout or a server error
+                # the message may have been delivered anyway, a rate limited webhook needs fewer requests,
+                # and any other client error (e.g. a deleted webhook) would just fail for every part too
+                status = exc.response.status_code if exc.response is not None else None
+                if status != 400 and status != 413:
+                    return [(notification, exc) for notification in batch]
+
+                # don't let one bad notification take down the others
+                logger.warning('Webhook "%s" failed to send %s notifications at once, sending them separately',
+                               self.name, len(batch),
+                               exc_info=exc)
+
+        results: list[tuple[PendingNotification, Optional[requests.exceptions.RequestException]]] = []
+        for notification in batch:
+            try:
+                post_notification(self.url, self._create_post_json([notification])).raise_for_status()
+                results.append((notification, None))
+            except requests.exceptions.RequestException as exc:
+                results.append((notification, exc))
+
+        return results
+
+    @staticmethod
+    def _create_batches(pending: Sequence[PendingNotification]) -> list[list[PendingNotification]]:
+        batches: list[list[PendingNotification]] = []
+        batch: list[PendingNotification] = []
+        length = 0
+        for notification in pending:
+            # contents are joined by newlines, a notification that's too long by itself is still sent on its own
+            content_length = len(notification.content)
+            if batch:
+                if len(batch) < NOTIFY_MAX_EMBEDS and length + 1 + content_length <= NOTIFY_MAX_CONTENT_LENGTH:
+                    batch.append(notification)
+                    length += 1 + content_length
+                    continue
+                batches.append(batch)
+
+            batch = [notification]
+            length = content_length
+
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _create_post_json(batch: Sequence[PendingNotification]) -> Mapping[str, Any]:
+        allowed_mentions: Mapping[str, Any]
+        if len(batch) == 1:
+            allowed_mentions = batch[0].creator.allowed_mentions
+        else:
+            everyone: bool = False
+            roles: set[str] = set()
+            users: set[str] = set()
+            for notification in batch:
+                creator = notification.creator
+                everyone = everyone or creator.ping_everyone or creator.ping_here
+                roles.update(creator.ping_roles)
+                users.update(creator.ping_users)
+
+            allowed_mentions = create_allowed_mentions_dict(everyone, roles, users)
+
+        return {
+            'content': '\n'.join([notification.content for notification in batch]),
+            'embeds': [notification.embed for notification in batch],
+            'allowed_mentions': allowed_mentions,
+        }
+
 
 class Notifier:
     config_url: Final[str]
-    config: NotifierConfig
-    last_config_update: datetime
+    config: Optional[NotifierConfig]  # None until the first configuration is applied
+    last_config_update: float  # time.monotonic() of the last successful update
     config_update_interval: timedelta
 
+    # cache validators of the current configuration, sent to make the update request conditional
+    _config_etag: Optional[str]
+    _config_last_modified: Optional[str]
+    # digest of the current configuration's body, for servers that don't send validators
+    _config_digest: Optional[bytes]
+
     user_agent: str
     email: str
     webhooks: dict[str, DiscordWebhook]
+    # webhooks grouped by URL, webhooks that share a URL are notified together
+    webhooks_by_url: dict[str, list[DiscordWebhook]]
     tracked_creators: dict[str, str]
 
+    # sent with every request to Picarto, built from user_agent and email
+    _picarto_headers: Mapping[str, str]
+
+    # notifies webhooks concurrently, sized to the number of webhook URLs
+    _notify_pool: ThreadPoolExecutor
+    _notify_pool_size: int
+
+    # consecutive checks that found no tracked creators online, used to back off
+    _idle_checks: int
+
+    # set by stop(), ends the check loop
+    _stopping: bool
+    # stop() writes to _wakeup_w to end a wait for the next check early. unlike a threading.Event,
+    # this doesn't take any locks, so stop() is safe to call from a signal handler
+    _wakeup_r: socket.socket
+    _wakeup_w: socket.socket
+
+    # result of the last check, reused if Picarto reports nothing changed since then
+    _online_creators: Optional[dict[str, Mapping[str, Any]]]
+    _online_etag: Optional[str]
+    _online_last_modified: Optional[str]
+    # online creators of the last check, if every webhook has already been notified about all of them
+    _settled_online: Optional[frozenset[str]]
+
     def __init__(self, config_url: str):
         self.config_url = config_url
+        self.config = None
         self.config_update_interval = CONFIG_UPDATE_INTERVAL
+        self._config_etag = None
+        self._config_last_modified = None
+        self._config_digest = None
         self.webhooks = {}
+        self.webhooks_by_url = {}
         self.tracked_creators = {}
+        # threads are only started once there's work, resized along with the configuration
+        self._notify_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notifier')
+        self._notify_pool_size = 1
+        self._idle_checks = 0
+        self._stopping = False
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+        self._online_creators = None
+        self._online_etag = None
+        self._online_last_modified = None
+        self._settled_online = None
 
     def run(self):
         if self.update_config():
@@ -445,98 +832,196 @@ class Notifier:
             logger.critical('Failed to fetch initial configuration, exiting')
             exit(-1)
 
-        while True:
+        while not self._stopping:
+            logger.debug('Checking for online creators')
+
+            check_start = monotonic()
+            success = True
+
+            if monotonic() - self.last_config_update >= self.config_update_interval.total_seconds():
+                self.update_config()
+
+            online_creators: Optional[dict[str, Mapping[str, Any]]] = None
+            response: Any = None
             try:
-                logger.debug('Checking for online creators')
-
-                success = True
-
-                now = datetime.now(timezone.utc)
-                if now - self.last_config_update >= self.config_update_interval:
-                    self.update_config()
-
-                response: list[dict[str, Any]] = []
-                try:
-                    response = requests.get(
-                        'https://api.picarto.tv/api/v1/online?adult=true&gaming=true',
-                        headers={
-                            'User-Agent': self.user_agent,
-                            'From': self.email
-                        },
-                        timeout=10).json()
-                except requests.exceptions.RequestException as exc:
-                    logger.error('Failed to fetch online creators from Picarto',
-                                 exc_info=exc)
+                response = self._fetch_online_response()
+                if response is _NOT_MODIFIED:
+                    online_creators = self._online_creators
+            except (requests.exceptions.RequestException, orjson.JSONDecodeError) as exc:
+                logger.error('Failed to fetch online creators from Picarto',
+                             exc_info=exc)
+                success = False
+
+            if success and online_creators is None:
+                # JSON arrays are always decoded as lists, skip the slower ABC check for them
+                if type(response) is not list and not isinstance(response, Sequence):
+                    logger.error("Unexpected API response (expected 'Sequence', got '%r')",
+                                 response)
+                    success = False
+
+            if success and online_creators is None:
+                # only keep creators that at least one webhook tracks
+                tracked = self.tracked_creators
+                entries = [data for data in response
+                           if type(data) is dict and type(data.get('name')) is str]
+                if len(entries) != len(response):
+                    # only walk the response again to report what's wrong with it
+                    validate_online_response(response)
                     success = False
 
+                online_creators = {key: data for data in entries
+                                   if (key := data['name'].casefold()) in tracked}
+
+                # a malformed response isn't reused, the next check fetches it in full and reports it again
                 if success:
-                    if not isinstance(response, Sequence):
-                        logger.error("Unexpected API response (expected 'Sequence', got '%s')",
-                                     repr(response))
+                    self._online_creators = online_creators
+
+                # the full response is usually large and mostly untracked creators,
+                # don't hold on to it while notifying and sleeping
+                del response, entries
+
+            if online_creators is not None:
+                if online_creators:
+                    self._idle_checks = 0
+                else:
+                    self._idle_checks = min(self._idle_checks + 1, CHECK_INTERVAL_IDLE_MAX_STEPS)
+
+                # if the same creators are online and every webhook already notified them,
+                # notifying again wouldn't do anything
+                if online_creators.keys() != self._settled_online:
+                    timestamp = create_timestamp()
+                    embeds: dict[str, Mapping[str, Any]] = {}
+                    results = list(self._notify_pool.map(
+                        lambda ws: self._notify_url(ws, online_creators, timestamp, embeds),
+                        self.webhooks_by_url.values()))
+
+                    self._settled_online = None
+                    if not all(results):
                         success = False
+                    elif self._is_settled(online_creators):
+                        self._settled_online = frozenset(online_creators)
 
-                if success:
-                    online_creators = {}
-                    for i, data in enumerate(response):
-                        if not isinstance(data, Mapping):
-                            logger.error("Unexpected API response (expected 'str' at [%s].name, got '%s')",
-                                         i, repr(data))
-                            success = False
-                            continue
+            interval = self._check_interval() if success else CHECK_INTERVAL_ERROR
+            # the time spent on this check counts towards the interval, so checks don't drift
+            self._wait(max(0.0, interval.total_seconds() - (monotonic() - check_start)))
 
-                        if 'name' not in data:
-                            logger.error("Unexpected API response (Mapping at index %s missing key 'name')",
-                                         i)
-                            success = False
-                            continue
+    def stop(self):
+        # makes run() return after the current check, or right away if it's waiting for the next one
+        self._stopping = True
+        try:
+            self._wakeup_w.send(b'\0')
+        except BlockingIOError:
+            # plenty of wakeups are pending already
+            pass
 
-                        creator_name = data.get('name')
-                        if not isinstance(creator_name, str):
-                            logger.error("Unexpected API response (expected 'str' at [%s].name, got '%s')",
-                                         i, repr(creator_name))
-                            success = False
-                            continue
+    def _wait(self, timeout: float):
+        if select.select([self._wakeup_r], [], [], timeout)[0]:
+            try:
+                while self._wakeup_r.recv(64):
+                    pass
+            except BlockingIOError:
+                pass
 
-                        online_creators[creator_name.casefold()] = data
+    def _fetch_online_response(self) -> Any:
+        headers = self._picarto_headers
+        # cleared whenever a configuration update changes which creators we keep
+        if self._online_creators is not None:
+            headers = dict(headers)
+            if self._online_etag is not None:
+                headers['If-None-Match'] = self._online_etag
+            if self._online_last_modified is not None:
+                headers['If-Modified-Since'] = self._online_last_modified
+
+        response = session.get('https://api.picarto.tv/api/v1/online?adult=true&gaming=true',
+                               headers=headers, timeout=10)
+        if response.status_code == 304:
+            return _NOT_MODIFIED
+
+        # the last result is replaced once this response is processed
+        self._online_creators = None
+        self._online_etag = response.headers.get('ETag')
+        self._online_last_modified = response.headers.get('Last-Modified')
+        return orjson.loads(response.content)
+
+    @staticmethod
+    def _notify_url(webhooks: Sequence[DiscordWebhook],
+                    online_creators: Mapping[str, Mapping[str, Any]], timestamp: str,
+                    embeds: dict[str, Mapping[str, Any]]) -> bool:
+        success: bool = True
 
-                    for webhook in self.webhooks.values():
-                        if not webhook.notify(online_creators):
-                            success = False
+        # webhooks sharing a URL are notified one after another,
+        # so a creator is only posted once for each distinct set of pings
+        sent: dict[str, PicartoCreator] = {}
+        for webhook in webhooks:
+            if not webhook.notify(online_creators, timestamp, embeds, sent):
+                success = False
 
-                if success:
-                    sleep(CHECK_INTERVAL.total_seconds())
-                else:
-                    sleep(CHECK_INTERVAL_ERROR.total_seconds())
-            except KeyboardInterrupt:
-                break
+        return success
+
+    def _is_settled(self, online_creators: Mapping[str, Mapping[str, Any]]) -> bool:
+        # creators held back by NOTIFY_INTERVAL are still waiting to be notified
+        return all(online_creators.keys() & webhook.creators.keys() <= webhook.online_creators
+                   for webhook in self.webhooks.values())
+
+    def _check_interval(self) -> timedelta:
+        # check less often while nobody we track is streaming
+        return CHECK_INTERVAL * (1 + CHECK_INTERVAL_IDLE_BACKOFF * self._idle_checks)
 
     def update_config(self,
                       *, indent: str = '') -> bool:
         logger.info('%sFetching latest configuration from "%s"', indent, self.config_url)
 
-        new_config: NotifierConfig
+        headers: dict[str, str] = {}
+        if self._config_etag is not None:
+            headers['If-None-Match'] = self._config_etag
+        if self._config_last_modified is not None:
+            headers['If-Modified-Since'] = self._config_last_modified
+
+        response: requests.Response
+        new_config: Optional[NotifierConfig]
+        digest: Optional[bytes] = None
         try:
-            new_config = requests.get(self.config_url, timeout=10).json()
-        except requests.exceptions.RequestException as exc:
+            response = session.get(self.config_url, headers=headers, timeout=10)
+            if response.status_code != 304:
+                digest = blake2b(response.content, digest_size=16).digest()
+
+            if digest is None or digest == self._config_digest:
+                new_config = self.config
+            else:
+                new_config = orjson.loads(response.content)
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as exc:
             logger.error('%sFailed to fetch latest configuration:', indent,
                          exc_info=exc)
             self.config_update_interval = CONFIG_UPDATE_INTERVAL_ERROR
             return False
 
+        if new_config == self.config:
+            # already validated and applied, nothing to do
+            logger.info('%sLatest configuration is unchanged', indent)
+            self._update_config_validators(response, digest)
+            self.last_config_update = monotonic()
+            self.config_update_interval = CONFIG_UPDATE_INTERVAL
+            return True
+
         if not validate_config(new_config):
             logger.error('%sLatest configuration is invalid, continuing with current configuration', indent)
             self.config_update_interval = CONFIG_UPDATE_INTERVAL_ERROR
             return False
 
         self.config = new_config
-        self.last_config_update = datetime.now(timezone.utc)
+        self._update_config_validators(response, digest)
+        self.last_config_update = monotonic()
 
         logger.info('%sApplying latest configuration', indent)
 
         self.user_agent = self.config['user_agent']
         self.email = self.config['email']
+        self._picarto_headers = {
+            'User-Agent': self.user_agent,
+            'From': self.email
+        }
 
-        removed_webhooks: set[str] = set(self.webhooks.keys())
+        removed_webhooks = self.webhooks.keys() - {w_name.casefold() for w_name in self.config['webhooks']}
 
         w_indent = indent + '  '
         for w_name, w_config in self.config['webhooks'].items():
@@ -549,32 +1034,62 @@ class Notifier:
                 logger.debug('%sNew webhook "%s" added:', indent, w_name)
                 self.webhooks[key] = DiscordWebhook(w_name, w_config, indent=w_indent)
 
-            removed_webhooks.discard(key)
-
         for key in removed_webhooks:
-            webhook = self.webhooks.pop(key, None)
-            if webhook is not None:
-                logger.debug('%sWebhook "%s" removed', indent, webhook.name)
-
-        self.tracked_creators.clear()
+            webhook = self.webhooks.pop(key)
+            logger.debug('%sWebhook "%s" removed', indent, webhook.name)
+            webhook.shutdown()
 
+        self.webhooks_by_url.clear()
         for webhook in self.webhooks.values():
-            for creator_key, creator in webhook.creators.items():
-                self.tracked_creators[creator_key] = creator.name
+            self.webhooks_by_url.setdefault(webhook.url, []).append(webhook)
+
+        self.tracked_creators = {key: creator.name for webhook in self.webhooks.values()
+                                 for key, creator in webhook.creators.items()}
+        # filtered by, and notified with, the previous webhooks and creators
+        self._online_creators = None
+        self._settled_online = None
+
+        self._resize_notify_pool()
 
         logger.info('%sLatest configuration applied', indent)
 
         self.config_update_interval = CONFIG_UPDATE_INTERVAL
         return True
 
+    def _update_config_validators(self, response: requests.Response, digest: Optional[bytes]):
+        if digest is not None:
+            self._config_etag = response.headers.get('ETag')
+            self._config_last_modified = response.headers.get('Last-Modified')
+            self._config_digest = digest
+
+    def _resize_notify_pool(self):
+        # one thread per webhook URL, anything past NOTIFY_MAX_IN_FLIGHT would just wait on _notify_slots
+        size = max(1, min(NOTIFY_MAX_IN_FLIGHT, len(self.webhooks_by_url)))
+        if self._notify_pool_size == size:
+            return
+        self._notify_pool.shutdown(wait=False)
+
+        self._notify_pool = ThreadPoolExecutor(max_workers=size,
+                                               thread_name_prefix='notifier')
+        self._notify_pool_size = size
+
 
 if __name__ == '__main__':
     _config_url: str
     try:
         _config_url = os.environ[CONFIG_URL_ENV]
     except KeyError:
-        print(f'Please set environment variable "{CONFIG_URL_ENV}" to the URL of the configuration file')
+        logger.critical('Please set environment variable "%s" to the URL of the configuration file', CONFIG_URL_ENV)
         exit(1)
 
     _notifier = Notifier(_config_url)
+
+    # finish the current check (if any) and exit on Ctrl+C or when the container is stopped.
+    # a second signal is handled as usual, so it can still interrupt a request that hangs
+    def _stop_notifier(signum, frame):
+        signal.signal(signum, _default_handlers[signum])
+        _notifier.stop()
+
+    _default_handlers = {signum: signal.signal(signum, _stop_notifier)
+                         for signum in (signal.SIGINT, signal.SIGTERM)}
     _notifier.run()
@@ -0,0 +1,88 @@
+import os
+import sys
+from collections.abc import Callable, Iterator, Mapping
+from typing import Any, Optional
+
+import orjson
+import pytest
+import requests
+
+# main.py and structures.py live in the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+def make_response(status_code: int = 204, content: bytes = b'',
+                  headers: Optional[Mapping[str, str]] = None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    response.url = 'https://example.invalid/'
+    return response
+
+
+class FakePosts:
+    # records webhook POSTs made through main.session and answers them from a list of responses (or exceptions)
+    calls: list[tuple[str, Mapping[str, Any]]]
+    responses: list[Any]
+
+    def __init__(self):
+        self.calls = []
+        self.responses = []
+
+    def __call__(self, url: str, data: bytes, **kwargs) -> requests.Response:
+        self.calls.append((url, orjson.loads(data)))
+        response = self.responses.pop(0) if self.responses else make_response()
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    @property
+    def payloads(self) -> list[Mapping[str, Any]]:
+        return [payload for _, payload in self.calls]
+
+
+class FakeGets:
+    # records GETs made through main.session (with their headers) and answers them from a list of responses
+    headers: list[Mapping[str, str]]
+    responses: list[requests.Response]
+
+    def __init__(self):
+        self.headers = []
+        self.responses = []
+
+    def __call__(self, url: str, headers: Mapping[str, str], **kwargs) -> requests.Response:
+        self.headers.append(dict(headers))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def posts(monkeypatch: pytest.MonkeyPatch) -> FakePosts:
+    fake = FakePosts()
+    monkeypatch.setattr(main.session, 'post', fake)
+    return fake
+
+
+@pytest.fixture
+def gets(monkeypatch: pytest.MonkeyPatch) -> FakeGets:
+    fake = FakeGets()
+    monkeypatch.setattr(main.session, 'get', fake)
+    return fake
+
+
+@pytest.fixture
+def make_webhook() -> Iterator[Callable[..., main.DiscordWebhook]]:
+    webhooks: list[main.DiscordWebhook] = []
+
+    def make(creators: Mapping[str, Any], url: str = 'https://discord.invalid/api/webhooks/1/a',
+             name: str = 'Webhook') -> main.DiscordWebhook:
+        webhook = main.DiscordWebhook(name, {'url': url, 'creators': creators})
+        webhooks.append(webhook)
+        return webhook
+
+    yield make
+
+    for webhook in webhooks:
+        webhook.shutdown()
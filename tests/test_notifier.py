@@ -0,0 +1,112 @@
+from collections.abc import Iterator
+from typing import Any
+
+import orjson
+import pytest
+
+import main
+from conftest import make_response
+
+CONFIG: dict[str, Any] = {
+    'user_agent': 'PicartoStreamNotifier tests',
+    'email': 'tests@example.invalid',
+    'webhooks': {
+        'Webhook': {
+            'url': 'https://discord.invalid/api/webhooks/1/a',
+            'creators': {'Alice': {'pings': ['@everyone']}},
+        },
+    },
+}
+
+
+@pytest.fixture
+def notifier() -> Iterator[main.Notifier]:
+    notifier = main.Notifier('https://config.invalid/config.json')
+    yield notifier
+
+    for webhook in notifier.webhooks.values():
+        webhook.shutdown()
+    notifier._notify_pool.shutdown(wait=False)
+
+
+@pytest.fixture
+def validations(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    validated: list[Any] = []
+    validate_config = main.validate_config
+
+    def validate(config, **kwargs) -> bool:
+        validated.append(config)
+        return validate_config(config, **kwargs)
+
+    monkeypatch.setattr(main, 'validate_config', validate)
+    return validated
+
+
+def test_update_config_applies_new_config(notifier, gets, validations):
+    gets.responses = [make_response(200, orjson.dumps(CONFIG), {'ETag': '"1"'})]
+
+    assert notifier.update_config()
+
+    assert notifier.config == CONFIG
+    assert validations == [CONFIG]
+    assert notifier.tracked_creators == {'alice': 'Alice'}
+    assert list(notifier.webhooks_by_url) == ['https://discord.invalid/api/webhooks/1/a']
+    assert notifier._picarto_headers['From'] == 'tests@example.invalid'
+
+
+def test_update_config_reuses_config_when_not_modified(notifier, gets, validations):
+    gets.responses = [make_response(200, orjson.dumps(CONFIG), {'ETag': '"1"'}),
+                      make_response(304)]
+    assert notifier.update_config()
+    webhook = notifier.webhooks['webhook']
+
+    assert notifier.update_config()
+
+    assert gets.headers[1]['If-None-Match'] == '"1"'
+    assert len(validations) == 1
+    assert notifier.webhooks['webhook'] is webhook
+
+
+def test_update_config_skips_parsing_an_identical_body(notifier, gets, validations, monkeypatch):
+    # without validators every request is answered in full, the body digest catches unchanged ones
+    body = orjson.dumps(CONFIG)
+    gets.responses = [make_response(200, body), make_response(200, body)]
+    assert notifier.update_config()
+
+    def loads(content):
+        raise AssertionError('parsed an unchanged body')
+
+    monkeypatch.setattr(main.orjson, 'loads', loads)
+    assert notifier.update_config()
+
+    assert gets.headers[1] == {}
+    assert len(validations) == 1
+
+
+def test_update_config_skips_applying_an_unchanged_config(notifier, gets, validations):
+    gets.responses = [make_response(200, orjson.dumps(CONFIG)),
+                      make_response(200, orjson.dumps(CONFIG, option=orjson.OPT_INDENT_2))]
+    assert notifier.update_config()
+    webhook = notifier.webhooks['webhook']
+
+    assert notifier.update_config()
+
+    assert len(validations) == 1
+    assert notifier.webhooks['webhook'] is webhook
+    assert notifier.config_update_interval == main.CONFIG_UPDATE_INTERVAL
+
+
+def test_update_config_keeps_current_config_if_invalid(notifier, gets):
+    invalid = dict(CONFIG, webhooks={'Webhook': 'https://discord.invalid/api/webhooks/1/a'})
+    gets.responses = [make_response(200, orjson.dumps(CONFIG), {'ETag': '"1"'}),
+                      make_response(200, orjson.dumps(invalid), {'ETag': '"2"'}),
+                      make_response(200, orjson.dumps(invalid), {'ETag': '"2"'})]
+    assert notifier.update_config()
+
+    assert not notifier.update_config()
+
+    assert notifier.config == CONFIG
+    assert notifier.config_update_interval == main.CONFIG_UPDATE_INTERVAL_ERROR
+    # the rejected config's validators aren't kept, so it's fetched (and reported) in full again
+    assert not notifier.update_config()
+    assert gets.headers[2]['If-None-Match'] == '"1"'
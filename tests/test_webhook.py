@@ -0,0 +1,148 @@
+from typing import Any, Optional
+
+import pytest
+import requests
+
+import main
+from conftest import make_response
+
+TIMESTAMP = '202601010000'
+
+
+def online(*names: str) -> dict[str, dict[str, Any]]:
+    return {name.casefold(): {'name': name} for name in names}
+
+
+def creators(*names: str, pings: Optional[list[Any]] = None) -> dict[str, Any]:
+    return {name: {'pings': pings or []} for name in names}
+
+
+def test_notify_combines_creators_into_one_message(posts, make_webhook):
+    webhook = make_webhook(creators('Alice', 'Bob', pings=[{'role': '1'}]))
+
+    assert webhook.notify(online('Alice', 'Bob'), TIMESTAMP, {}, {})
+
+    assert len(posts.payloads) == 1
+    payload = posts.payloads[0]
+    assert len(payload['embeds']) == 2
+    assert len(payload['content'].split('\n')) == 2
+    assert payload['allowed_mentions']['roles'] == ['1']
+    assert webhook.online_creators == {'alice', 'bob'}
+
+
+def test_notify_caps_embeds_per_message(posts, make_webhook):
+    names = [f'Creator{i}' for i in range(main.NOTIFY_MAX_EMBEDS + 2)]
+    webhook = make_webhook(creators(*names))
+
+    assert webhook.notify(online(*names), TIMESTAMP, {}, {})
+
+    assert sorted(len(payload['embeds']) for payload in posts.payloads) == [2, main.NOTIFY_MAX_EMBEDS]
+
+
+def test_notify_caps_content_length_per_message(posts, make_webhook):
+    # every creator pings enough users to fill more than a third of a message
+    pings = [{'user': str(10 ** 17 + i)} for i in range(40)]
+    names = ['Alice', 'Bob', 'Carol']
+    webhook = make_webhook(creators(*names, pings=pings))
+
+    assert webhook.notify(online(*names), TIMESTAMP, {}, {})
+
+    assert len(posts.payloads) == 2
+    for payload in posts.payloads:
+        assert len(payload['content']) <= main.NOTIFY_MAX_CONTENT_LENGTH
+    assert webhook.online_creators == {'alice', 'bob', 'carol'}
+
+
+@pytest.mark.parametrize('status_code', [400, 413])
+def test_rejected_message_is_sent_separately(posts, make_webhook, status_code):
+    webhook = make_webhook(creators('Alice', 'Bob'))
+    posts.responses = [make_response(status_code)]
+
+    assert webhook.notify(online('Alice', 'Bob'), TIMESTAMP, {}, {})
+
+    assert [len(payload['embeds']) for payload in posts.payloads] == [2, 1, 1]
+    assert webhook.online_creators == {'alice', 'bob'}
+
+
+@pytest.mark.parametrize('failure', [
+    make_response(401),
+    make_response(404),
+    make_response(429),
+    make_response(500),
+    requests.exceptions.ConnectionError(),
+])
+def test_failed_message_is_not_split(posts, make_webhook, failure):
+    webhook = make_webhook(creators('Alice', 'Bob'))
+    posts.responses = [failure]
+
+    assert not webhook.notify(online('Alice', 'Bob'), TIMESTAMP, {}, {})
+
+    # the next check retries the whole batch
+    assert len(posts.payloads) == 1
+    assert webhook.online_creators == set()
+    assert webhook.last_notified == {}
+
+
+def test_webhooks_sharing_a_url_post_each_creator_once(posts, make_webhook):
+    first = make_webhook(creators('Alice', pings=['@here']), name='First')
+    second = make_webhook(creators('Alice', pings=['@here']), name='Second')
+    sent: dict[str, main.PicartoCreator] = {}
+
+    assert first.notify(online('Alice'), TIMESTAMP, {}, sent)
+    assert second.notify(online('Alice'), TIMESTAMP, {}, sent)
+
+    assert len(posts.payloads) == 1
+    assert second.online_creators == {'alice'}
+    assert 'alice' in second.last_notified
+
+
+def test_webhooks_sharing_a_url_keep_their_own_pings(posts, make_webhook):
+    first = make_webhook(creators('Alice'), name='First')
+    second = make_webhook(creators('Alice', pings=[{'role': '1'}]), name='Second')
+    sent: dict[str, main.PicartoCreator] = {}
+
+    assert first.notify(online('Alice'), TIMESTAMP, {}, sent)
+    assert second.notify(online('Alice'), TIMESTAMP, {}, sent)
+
+    assert len(posts.payloads) == 2
+    assert posts.payloads[1]['allowed_mentions']['roles'] == ['1']
+
+
+def test_notify_throttles_creators_until_notify_interval_passed(posts, make_webhook, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(main, 'monotonic', lambda: now)
+    webhook = make_webhook(creators('Alice'))
+
+    assert webhook.notify(online('Alice'), TIMESTAMP, {}, {})
+    # goes offline and comes back right away
+    assert webhook.notify(online(), TIMESTAMP, {}, {})
+    assert webhook.notify(online('Alice'), TIMESTAMP, {}, {})
+    assert len(posts.payloads) == 1
+
+    webhook.notify(online(), TIMESTAMP, {}, {})
+    now += main.NOTIFY_INTERVAL.total_seconds()
+    assert webhook.notify(online('Alice'), TIMESTAMP, {}, {})
+    assert len(posts.payloads) == 2
+    assert webhook.last_notified == {'alice': now}
+
+
+def test_notify_forgets_stale_notifications(posts, make_webhook, monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(main, 'monotonic', lambda: now)
+    webhook = make_webhook(creators('Alice', 'Bob'))
+    interval = main.NOTIFY_INTERVAL.total_seconds()
+    webhook.last_notified = {'alice': now - interval, 'bob': now - interval + 1}
+
+    webhook.notify(online(), TIMESTAMP, {}, {})
+
+    assert webhook.last_notified == {'bob': now - interval + 1}
+
+
+def test_notify_keeps_last_notified_without_stale_entries(posts, make_webhook, monkeypatch):
+    monkeypatch.setattr(main, 'monotonic', lambda: 1000.0)
+    webhook = make_webhook(creators('Alice'))
+    webhook.last_notified = last_notified = {'alice': 999.0}
+
+    webhook.notify(online(), TIMESTAMP, {}, {})
+
+    assert webhook.last_notified is last_notified